@@ -63,19 +63,28 @@ import os
 import sys
 import io
 import json
+import mmap
+import ctypes
 import shutil
-import base64
+import subprocess
+import hashlib
+import functools
+import contextlib
+import tempfile
 import threading
 import webbrowser
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import OrderedDict
 from pathlib import Path
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Tuple, Optional, Iterator
+from dataclasses import dataclass, asdict, replace
 
 # Third-party imports
 try:
-    from PIL import Image
+    from PIL import Image, features
 except ImportError as e:
     print(f"""
 ╔═══════════════════════════════════════════════════════════════════════════════╗
@@ -90,6 +99,34 @@ Error details: {e}
 """)
     sys.exit(1)
 
+# Optional: libimagequant bindings for perceptual PNG palette quantization
+try:
+    import imagequant
+except ImportError:
+    imagequant = None
+
+# Optional: oxipng bindings for multi-threaded lossless PNG re-deflating
+try:
+    import oxipng
+except ImportError:
+    oxipng = None
+
+# Optional: libvips bindings for faster, lower-memory thumbnailing
+# (OSError: pyvips is installed but the libvips shared library is missing)
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+# Optional: mozjpeg's jpegtran for lossless Huffman/progressive-scan optimization
+try:
+    import mozjpeg_lossless_optimization
+except ImportError:
+    mozjpeg_lossless_optimization = None
+
+# libjpeg-turbo gives SIMD DCT/Huffman; stock libjpeg builds fall back to scalar code
+HAS_LIBJPEG_TURBO = bool(features.check_feature('libjpeg_turbo'))
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # CONFIGURATION
@@ -101,22 +138,48 @@ class CompressionConfig:
     quality: int = 85
     png_optimize: bool = True
     png_compress_level: int = 9
+    png_quantize_min_quality: int = 70   # libimagequant gives up below this
+    png_quantize_max_quality: int = 95
+    png_oxipng_level: int = 4            # oxipng preset 0-6, when installed
     create_backup: bool = True
     backup_suffix: str = "_original"
     progressive_jpeg: bool = True
+    webp_method: int = 4          # libwebp effort 0-6; 6 is ~3x slower for little gain
+    max_workers: int = 0          # 0 = one worker per CPU core
+    use_processes: bool = True    # False = thread pool (libjpeg/libwebp release the GIL)
+    min_recompress_bytes: int = 1024   # smaller files are left alone; 0 = compress everything
+    convert_to_webp: bool = False      # replace JPEG/PNG files with a smaller .webp copy
+
+
+# Linux ioctl that clones a file's extents (Btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Standard JPEG luminance quantization table (ITU-T T.81 Annex K), quality 50
+JPEG_LUMA_TABLE = (
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # UTILITY FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
+@functools.lru_cache(maxsize=4096)
 def format_file_size(size_bytes: int) -> str:
     """Convert bytes to human-readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f} TB"
+    # bit_length() - 1 is floor(log2(n)) in pure integer math; 1023 stays in bytes
+    unit = min(max(size_bytes.bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * unit)):.1f} {_SIZE_UNITS[unit]}"
 
 
 def get_image_extensions() -> Tuple[str, ...]:
@@ -124,55 +187,373 @@ def get_image_extensions() -> Tuple[str, ...]:
     return ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.tiff')
 
 
-def scan_for_images(directory: Path) -> List[Path]:
-    """Recursively scan directory for image files."""
-    images = []
-    extensions = get_image_extensions()
+@functools.lru_cache(maxsize=None)
+def find_mozjpeg_cjpeg() -> Optional[str]:
+    """Return the path of a mozjpeg build of cjpeg on PATH, or None."""
+    cjpeg = shutil.which('cjpeg')
+    if cjpeg is None:
+        return None
+
+    # libjpeg-turbo ships a cjpeg too, without trellis quantization
+    try:
+        result = subprocess.run([cjpeg, '-version'], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return cjpeg if 'mozjpeg' in (result.stdout + result.stderr).lower() else None
+
+
+@contextlib.contextmanager
+def open_mapped(path: Path) -> Iterator[mmap.mmap]:
+    """Map a file read-only so Image.open() reads it straight from the page cache."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
 
-    for root, dirs, files in os.walk(directory):
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ('venv', '.venv', 'node_modules')]
+def reflink_or_copy(src: Path, dst: Path, allow_hardlink: bool = False):
+    """Copy a file, sharing its blocks via copy-on-write clone where supported.
 
-        for file in files:
-            if file.startswith('.'):
+    With ``allow_hardlink``, fall back to a hard link before a full copy; only
+    safe when ``src`` will be replaced by rename rather than written in place.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            import fcntl
+            with open(src, 'rb') as src_file, open(dst, 'xb') as dst_file:
+                try:
+                    fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+                except OSError:
+                    # Remove the empty file so the fallbacks below can create dst
+                    os.unlink(dst)
+                    raise
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass  # EOPNOTSUPP/EXDEV/EINVAL: not a reflink-capable filesystem
+
+    elif sys.platform == 'darwin':
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0:
+                return
+        except (OSError, AttributeError):
+            pass
+
+    if allow_hardlink:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass  # EXDEV/EPERM: different filesystem or links not allowed
+
+    try:
+        shutil.copy2(src, dst)
+    except BaseException:
+        # A truncated backup would look complete to the exists() check next run
+        with contextlib.suppress(OSError):
+            os.unlink(dst)
+        raise
+
+
+def is_fully_opaque(img: Image.Image) -> bool:
+    """Return True if every pixel of an image with an alpha band is opaque."""
+    # getchannel copies only the alpha band, and getextrema is a single C pass
+    return img.getchannel('A').getextrema() == (255, 255)
+
+
+IMAGE_EXTENSIONS = frozenset(get_image_extensions())
+SKIPPED_DIRS = frozenset(('venv', '.venv', 'node_modules'))
+
+
+def _iter_images(directory: Path) -> Iterator[os.DirEntry]:
+    """Yield DirEntry objects for image files under directory."""
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
                 continue
-            if '_original' in file or '_backup' in file:
+
+            if entry.is_dir(follow_symlinks=False):
+                if name not in SKIPPED_DIRS:
+                    yield from _iter_images(entry.path)
                 continue
 
-            if file.lower().endswith(extensions):
-                images.append(Path(root) / file)
+            if '_original' in name or '_backup' in name:
+                continue
 
-    return sorted(images)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                yield entry
 
 
-def create_thumbnail_base64(image_path: Path, size: Tuple[int, int] = (150, 150)) -> str:
-    """Create a base64-encoded thumbnail preview of an image."""
-    try:
-        with Image.open(image_path) as img:
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGBA', img.size, (240, 240, 240, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                if img.mode in ('RGBA', 'LA'):
-                    background.paste(img, mask=img.split()[-1])
-                else:
-                    background.paste(img)
-                img = background.convert('RGB')
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
+def scan_for_images_with_stats(directory: Path) -> List[Tuple[Path, os.stat_result]]:
+    """Recursively scan directory for image files, stat-ing each one once."""
+    found = []
+    for entry in _iter_images(directory):
+        try:
+            found.append((Path(entry.path), entry.stat()))
+        except OSError as e:
+            print(f"Error reading {entry.path}: {e}")
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ThumbnailCache:
+    """Thumbnail JPEGs keyed by path, mtime and thumbnail size, held in memory and on disk."""
+
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, cache_dir: Path = None, max_entries: int = 5000, memory_entries: int = 512):
+        self.cache_dir = cache_dir or Path.home() / '.cache' / 'qpassets' / 'thumbs'
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._puts = 0
+
+    def _key(self, image_path: Path, size: Tuple[int, int],
+             stat: Optional[os.stat_result] = None) -> str:
+        stat = stat or image_path.stat()
+        key = f"{image_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{size[0]}x{size[1]}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def _remember(self, key: str, data: bytes):
+        with self._memory_lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, image_path: Path, size: Tuple[int, int],
+            stat: Optional[os.stat_result] = None) -> Optional[bytes]:
+        """Return cached thumbnail bytes, or None on a miss."""
+        try:
+            key = self._key(image_path, size, stat)
+            with self._memory_lock:
+                data = self._memory.get(key)
+                if data is not None:
+                    self._memory.move_to_end(key)
+                    return data
+
+            entry = self.cache_dir / f"{key}.jpg"
+            data = entry.read_bytes()
+            # Bump the mtime so pruning evicts the least recently used entries
+            os.utime(entry)
+        except OSError:
+            return None
+
+        self._remember(key, data)
+        return data
+
+    def put(self, image_path: Path, size: Tuple[int, int], data: bytes,
+            stat: Optional[os.stat_result] = None):
+        """Store thumbnail bytes; failures only cost a future cache miss."""
+        try:
+            key = self._key(image_path, size, stat)
+            self._remember(key, data)
+            entry = self.cache_dir / f"{key}.jpg"
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=entry.parent, suffix='.tmp', delete=False) as out:
+                out.write(data)
+            os.replace(out.name, entry)
+        except OSError as e:
+            print(f"Error caching thumbnail for {image_path}: {e}")
+            return
+
+        self._puts += 1
+        if self._puts % self.PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used entries beyond max_entries."""
+        try:
+            entries = [(e.stat().st_mtime, e.path) for e in os.scandir(self.cache_dir)
+                       if e.name.endswith('.jpg')]
+        except OSError:
+            return
+
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+thumbnail_cache = ThumbnailCache()
+
+
+class CompressionCache:
+    """Persistent record of files already compressed, keyed by path, mtime, size and settings."""
+
+    MAX_ENTRIES = 20000
+
+    def __init__(self, cache_file: Path = None):
+        self.cache_file = cache_file or Path.home() / '.cache' / 'qpassets' / 'compressed.json'
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, list]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.cache_file.read_text())
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    @staticmethod
+    def _key(image_path: Path, config: 'CompressionConfig') -> Tuple[str, list]:
+        stat = os.stat(image_path)
+        path_key = hashlib.sha1(str(image_path.resolve()).encode()).hexdigest()
+        # Settings that change the output; a hit with other settings must not skip the file
+        return path_key, [str(image_path.resolve()), stat.st_mtime_ns, stat.st_size,
+                          config.quality, config.convert_to_webp]
+
+    @staticmethod
+    def _is_current(value: list) -> bool:
+        # Entries written before the path was stored start with an int and are dropped
+        if not isinstance(value, list) or not value or not isinstance(value[0], str):
+            return False
+        try:
+            stat = os.stat(value[0])
+        except OSError:
+            return False
+        return value[1:3] == [stat.st_mtime_ns, stat.st_size]
+
+    def lookup(self, image_path: Path, config: 'CompressionConfig') -> Optional[int]:
+        """Return the file size if it is unchanged since it was compressed with these settings."""
+        try:
+            path_key, value = self._key(image_path, config)
+        except OSError:
+            return None
+        with self._lock:
+            if self._load().get(path_key) == value:
+                return value[2]
+        return None
+
+    def record(self, image_path: Path, config: 'CompressionConfig'):
+        """Remember that image_path, as it is on disk now, needs no further compression."""
+        try:
+            path_key, value = self._key(image_path, config)
+        except OSError:
+            return
+        with self._lock:
+            entries = self._load()
+            entries.pop(path_key, None)  # Re-insert so the dict stays ordered oldest first
+            entries[path_key] = value
+
+    def save(self):
+        """Drop entries for files that changed or vanished, then write the cache back to disk."""
+        with self._lock:
+            if self._entries is None:
+                return
+            current = [(k, v) for k, v in self._entries.items() if self._is_current(v)]
+            self._entries = dict(current[-self.MAX_ENTRIES:])
+            data = json.dumps(self._entries)
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=self.cache_file.parent, suffix='.tmp',
+                                             delete=False) as out:
+                out.write(data)
+            os.replace(out.name, self.cache_file)
+        except OSError as e:
+            print(f"Error saving compression cache: {e}")
+
 
-            img.thumbnail(size, Image.Resampling.LANCZOS)
+compression_cache = CompressionCache()
 
-            # Create padded square thumbnail
-            thumb = Image.new('RGB', size, (250, 250, 250))
-            offset = ((size[0] - img.width) // 2, (size[1] - img.height) // 2)
-            thumb.paste(img, offset)
 
-            buffer = io.BytesIO()
-            thumb.save(buffer, format='JPEG', quality=85)
-            return base64.b64encode(buffer.getvalue()).decode('utf-8')
+def render_thumbnail(img: Image.Image, size: Tuple[int, int] = (150, 150)) -> bytes:
+    """Render an open image as a padded square JPEG thumbnail."""
+    # Let libjpeg decode at 1/2, 1/4 or 1/8 scale; a no-op for other formats
+    img.draft('RGB', (size[0] * 2, size[1] * 2))
+
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    elif img.mode not in ('RGBA', 'LA', 'RGB'):
+        img = img.convert('RGB')
+
+    # Cheap box pre-shrink so the resize below works on a small image
+    factor = int(max(img.width / size[0], img.height / size[1]) // 2)
+    if factor > 1:
+        img = img.reduce(factor)
+
+    # BILINEAR is a 2-tap kernel; at 150px it is indistinguishable from LANCZOS
+    img.thumbnail(size, Image.Resampling.BILINEAR)
+
+    # Flatten alpha only now, on the thumbnail-sized image, and not at all if opaque
+    if img.mode in ('RGBA', 'LA'):
+        if is_fully_opaque(img):
+            img = img.convert(img.mode[:-1])
+        else:
+            background = Image.new(img.mode[:-1], img.size, (240,) * (len(img.mode) - 1))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+
+    # Create padded square thumbnail
+    thumb = Image.new('RGB', size, (250, 250, 250))
+    offset = ((size[0] - img.width) // 2, (size[1] - img.height) // 2)
+    thumb.paste(img, offset)
+
+    buffer = io.BytesIO()
+    thumb.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def render_thumbnail_vips(image_path: Path, size: Tuple[int, int] = (150, 150)) -> bytes:
+    """Render the same padded square JPEG thumbnail as render_thumbnail, with libvips."""
+    # thumbnail() picks shrink-on-load for JPEG/WebP and streams the rest
+    thumb = pyvips.Image.thumbnail(str(image_path), size[0], height=size[1], size='down')
+    if thumb.bands < 3:
+        thumb = thumb.colourspace('srgb')
+    if thumb.hasalpha():
+        thumb = thumb.flatten(background=[240, 240, 240])
+    thumb = thumb.gravity('centre', size[0], size[1], extend='background',
+                          background=[250, 250, 250])
+    return thumb.jpegsave_buffer(Q=85, strip=True)
+
+
+def create_thumbnail(image_path: Path, size: Tuple[int, int] = (150, 150),
+                     img: Optional[Image.Image] = None,
+                     stat: Optional[os.stat_result] = None) -> bytes:
+    """Create a JPEG thumbnail preview of an image, or b'' if it can't be read.
+
+    Pass an already-open ``img`` or an existing ``stat`` for ``image_path`` to
+    avoid opening or stat-ing the file again.
+    """
+    cached = thumbnail_cache.get(image_path, size, stat)
+    if cached is not None:
+        return cached
+
+    try:
+        data = None
+        if pyvips is not None:
+            try:
+                data = render_thumbnail_vips(image_path, size)
+            except pyvips.Error as e:
+                print(f"libvips could not thumbnail {image_path}, using Pillow: {e}")
+
+        if data is None:
+            if img is not None:
+                data = render_thumbnail(img, size)
+            else:
+                with open_mapped(image_path) as mapped, Image.open(mapped) as opened:
+                    data = render_thumbnail(opened, size)
+
+        thumbnail_cache.put(image_path, size, data, stat)
+        return data
     except Exception as e:
         print(f"Error creating thumbnail for {image_path}: {e}")
-        return ""
+        return b''
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -184,79 +565,211 @@ class ImageCompressor:
 
     def __init__(self, config: CompressionConfig = None):
         self.config = config or CompressionConfig()
+        # Formats needing more than a plain save(); everything else is re-saved as-is
+        self._savers = {'JPEG': self._save_jpeg, 'PNG': self._save_png}
 
-    def get_image_info(self, image_path: Path) -> Dict:
+    def get_image_info(self, image_path: Path, stat: Optional[os.stat_result] = None) -> Dict:
         """Gather comprehensive information about an image file."""
-        stat = image_path.stat()
-
-        with Image.open(image_path) as img:
-            return {
-                'path': str(image_path),
-                'filename': image_path.name,
-                'original_size': stat.st_size,
-                'size_display': format_file_size(stat.st_size),
-                'dimensions': f"{img.width} × {img.height}",
-                'width': img.width,
-                'height': img.height,
-                'format': img.format or image_path.suffix.upper().replace('.', ''),
-                'thumbnail': create_thumbnail_base64(image_path)
-            }
+        stat = stat or image_path.stat()
+
+        # Only the header is parsed; thumbnails are fetched separately from /api/thumb
+        with open_mapped(image_path) as mapped, Image.open(mapped) as img:
+            width, height = img.size
+            image_format = img.format or image_path.suffix.upper().replace('.', '')
+
+        return {
+            'path': str(image_path),
+            'filename': image_path.name,
+            'original_size': stat.st_size,
+            'size_display': format_file_size(stat.st_size),
+            'dimensions': f"{width} × {height}",
+            'width': width,
+            'height': height,
+            'format': image_format,
+            'mtime': stat.st_mtime_ns,
+        }
 
     def compress_image(self, image_path: Path) -> Tuple[bool, int, str]:
         """Compress an image file while preserving dimensions."""
+        tmp_path = None
         try:
             original_size = image_path.stat().st_size
 
-            # Create backup if configured
-            if self.config.create_backup:
-                backup_path = image_path.parent / f"{image_path.stem}{self.config.backup_suffix}{image_path.suffix}"
-                if not backup_path.exists():
-                    shutil.copy2(image_path, backup_path)
-
-            with Image.open(image_path) as img:
-                original_format = img.format or image_path.suffix.upper().replace('.', '')
-                save_kwargs = self._get_save_params(original_format)
-
-                buffer = io.BytesIO()
-
-                if original_format.upper() in ('JPEG', 'JPG'):
-                    if img.mode in ('RGBA', 'LA', 'PA', 'P'):
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        if img.mode == 'P':
-                            img = img.convert('RGBA')
-                        if img.mode in ('RGBA', 'LA'):
-                            background.paste(img, mask=img.split()[-1])
-                        else:
-                            background.paste(img)
-                        img = background
-                    elif img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    img.save(buffer, format='JPEG', **save_kwargs)
-
-                elif original_format.upper() == 'PNG':
-                    img_to_save = self._optimize_png(img)
-                    img_to_save.save(buffer, format='PNG', **save_kwargs)
-
-                elif original_format.upper() == 'WEBP':
-                    img.save(buffer, format='WEBP', **save_kwargs)
-
-                else:
-                    img.save(buffer, format=original_format, **save_kwargs)
-
-                compressed_size = buffer.tell()
-
-                if compressed_size < original_size:
-                    buffer.seek(0)
-                    with open(image_path, 'wb') as f:
-                        f.write(buffer.read())
-                    savings = ((original_size - compressed_size) / original_size) * 100
-                    return True, compressed_size, f"-{savings:.1f}%"
-                else:
+            # A few hundred bytes of headers and palette leave nothing worth a decode
+            if original_size < self.config.min_recompress_bytes:
+                return True, original_size, "Already optimized"
+
+            with open_mapped(image_path) as mapped, Image.open(mapped) as img:
+                original_format = (img.format or image_path.suffix[1:]).upper()
+                if original_format == 'JPG':
+                    original_format = 'JPEG'
+
+                # Resolve first so a symlink is written through rather than replaced
+                target_path = image_path.resolve()
+                output_format, output_path = original_format, target_path
+                if self.config.convert_to_webp and original_format in ('JPEG', 'PNG') \
+                        and not image_path.is_symlink():
+                    webp_path = target_path.with_suffix('.webp')
+                    if not webp_path.exists():
+                        output_format, output_path = 'WEBP', webp_path
+
+                # Only the header has been parsed so far; skip the full decode and
+                # re-encode when it could not beat an already-tight JPEG, leaving
+                # only the lossless DCT-domain pass below
+                lossless_only = output_format == 'JPEG' and self._jpeg_at_target_quality(img)
+                if lossless_only and mozjpeg_lossless_optimization is None:
                     return True, original_size, "Already optimized"
 
+                save_kwargs = self._get_save_params(output_format)
+                if output_format == 'WEBP' and original_format == 'PNG':
+                    # PNG sources are lossless, so keep them that way
+                    save_kwargs['lossless'] = True
+
+                # Encode straight into a hidden temp file beside the original so a
+                # smaller result can be swapped in with an atomic rename
+                with tempfile.NamedTemporaryFile(dir=target_path.parent, prefix='.', suffix='.tmp',
+                                                 delete=False) as out:
+                    tmp_path = out.name
+
+                    saver = self._savers.get(output_format)
+                    if lossless_only:
+                        out.write(mapped)
+                    elif saver is not None:
+                        saver(img, out, save_kwargs)
+                    else:
+                        img.save(out, format=output_format, **save_kwargs)
+
+            if output_format == 'PNG':
+                self._recompress_png(Path(tmp_path))
+            elif output_format == 'JPEG':
+                self._recompress_jpeg(Path(tmp_path))
+
+            compressed_size = os.stat(tmp_path).st_size
+
+            if compressed_size < original_size:
+                # Back up only files that are about to change. The original inode
+                # is replaced, never rewritten, so a hard link is a safe backup
+                if self.config.create_backup:
+                    backup_path = image_path.parent / f"{image_path.stem}{self.config.backup_suffix}{image_path.suffix}"
+                    if not backup_path.exists():
+                        reflink_or_copy(target_path, backup_path, allow_hardlink=True)
+
+                shutil.copymode(target_path, tmp_path)
+                os.replace(tmp_path, output_path)
+                savings = ((original_size - compressed_size) / original_size) * 100
+                if output_path != target_path:
+                    os.unlink(target_path)
+                    return True, compressed_size, f"-{savings:.1f}% as WebP"
+                return True, compressed_size, f"-{savings:.1f}%"
+            else:
+                os.unlink(tmp_path)
+                return True, original_size, "Already optimized"
+
         except Exception as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
             return False, 0, f"Error: {str(e)}"
 
+    def compress_batch(self, image_paths: List[Path]) -> Iterator[Dict]:
+        """Compress several images concurrently, yielding results as they finish."""
+        # Files untouched since an earlier run at this quality need no encode at all
+        pending = []
+        for path in image_paths:
+            cached_size = compression_cache.lookup(path, self.config)
+            if cached_size is None:
+                pending.append(path)
+            else:
+                yield {'path': str(path), 'success': True, 'new_size': cached_size,
+                       'savings': "Already optimized"}
+        image_paths = pending
+        if not image_paths:
+            return
+
+        workers = min(self.config.max_workers or os.cpu_count() or 1, len(image_paths))
+        pool_kwargs = {'max_workers': workers, 'initializer': _init_compress_worker,
+                       'initargs': (self.config,)}
+
+        if self.config.use_processes:
+            # Spawn rather than fork: codecs like oxipng start native thread pools,
+            # and a forked child inherits their locks in whatever state they were
+            executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'),
+                                           **pool_kwargs)
+        else:
+            executor = ThreadPoolExecutor(**pool_kwargs)
+
+        # Keep only a couple of jobs per worker queued, so memory stays flat for
+        # huge selections and an abandoned stream does not leave a long backlog
+        queue_limit = workers * 2
+        remaining = iter(image_paths)
+        with executor:
+            in_flight = set()
+            try:
+                while True:
+                    for path in remaining:
+                        in_flight.add(executor.submit(_compress_worker, path))
+                        if len(in_flight) >= queue_limit:
+                            break
+                    if not in_flight:
+                        break
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, success, new_size, savings = future.result()
+                        if success:
+                            compression_cache.record(path, self.config)
+                        yield {
+                            'path': str(path),
+                            'success': success,
+                            'new_size': new_size,
+                            'savings': savings
+                        }
+            finally:
+                for future in in_flight:
+                    future.cancel()
+                compression_cache.save()
+
+    def _save_jpeg(self, img: Image.Image, out, save_kwargs: Dict):
+        """Flatten any alpha onto white and save as JPEG."""
+        if img.mode in ('RGBA', 'LA', 'PA', 'P'):
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            if img.mode in ('RGBA', 'LA'):
+                background.paste(img, mask=img.split()[-1])
+            else:
+                background.paste(img)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        cjpeg = find_mozjpeg_cjpeg()
+        if cjpeg is not None:
+            try:
+                self._save_mozjpeg(cjpeg, img, out, save_kwargs)
+                return
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"mozjpeg cjpeg failed, falling back to Pillow: {e}")
+                out.seek(0)
+                out.truncate()
+        img.save(out, format='JPEG', **save_kwargs)
+
+    def _save_mozjpeg(self, cjpeg: str, img: Image.Image, out, save_kwargs: Dict):
+        """Encode an RGB image with mozjpeg's cjpeg (trellis quantization on by default)."""
+        ppm = io.BytesIO()
+        img.save(ppm, format='PPM')
+
+        # Standard Annex K tables keep the quality scale, and the skip check, unchanged
+        args = [cjpeg, '-quality', str(save_kwargs['quality']), '-quant-table', '0', '-optimize']
+        if not save_kwargs.get('progressive'):
+            args.append('-baseline')
+        out.flush()
+        subprocess.run(args, input=ppm.getvalue(), stdout=out, stderr=subprocess.PIPE,
+                       check=True, timeout=120)
+
+    def _save_png(self, img: Image.Image, out, save_kwargs: Dict):
+        """Reduce colors where possible and save as PNG."""
+        self._optimize_png(img).save(out, format='PNG', **save_kwargs)
+
     def _get_save_params(self, format: str) -> Dict:
         """Get format-specific save parameters."""
         format_upper = format.upper()
@@ -273,25 +786,118 @@ class ImageCompressor:
                 'compress_level': self.config.png_compress_level,
             }
         elif format_upper == 'WEBP':
-            return {'quality': self.config.quality, 'method': 6}
+            return {'quality': self.config.quality, 'method': self.config.webp_method}
         elif format_upper == 'GIF':
             return {'optimize': True}
         return {}
 
+    def _jpeg_at_target_quality(self, img: Image.Image) -> bool:
+        """Check whether a progressive JPEG is already quantized at or below the target quality."""
+        # Baseline files usually still shrink from Huffman optimization and
+        # progressive re-encoding alone, so only progressive ones are skipped
+        if not img.info.get('progressive'):
+            return False
+
+        tables = getattr(img, 'quantization', None)
+        if not tables or 0 not in tables:
+            return False
+
+        # Same quality scaling libjpeg applies to the standard table
+        quality = max(1, min(self.config.quality, 100))
+        scale = 5000 / quality if quality < 50 else 200 - 2 * quality
+        target = sum(min(max(int((value * scale + 50) // 100), 1), 255) for value in JPEG_LUMA_TABLE)
+
+        return sum(tables[0]) >= target
+
     def _optimize_png(self, img: Image.Image) -> Image.Image:
         """Apply PNG-specific optimizations."""
-        if img.mode == 'RGBA':
-            alpha = img.split()[-1]
-            if alpha.getextrema() == (255, 255):
-                img = img.convert('RGB')
+        if img.mode in ('RGBA', 'LA') and is_fully_opaque(img):
+            img = img.convert(img.mode[:-1])
 
-        if img.mode == 'RGB':
+        if img.mode in ('RGB', 'RGBA'):
             colors = img.getcolors(maxcolors=256)
-            if colors is not None:
-                img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=len(colors))
+            if colors is None:
+                img = self._trim_palette(self._quantize_png(img))
+            elif img.mode == 'RGB':
+                img = self._trim_palette(
+                    img.convert('P', palette=Image.Palette.ADAPTIVE, colors=len(colors)))
+
+        return img
+
+    def _recompress_png(self, png_path: Path):
+        """Losslessly re-deflate an encoded PNG in place with oxipng, if available."""
+        if oxipng is None:
+            return
+
+        try:
+            oxipng.optimize(png_path, level=self.config.png_oxipng_level,
+                            strip=oxipng.StripChunks.safe())
+        except Exception as e:
+            print(f"oxipng failed on {png_path}, keeping Pillow output: {e}")
+
+    def _recompress_jpeg(self, jpeg_path: Path):
+        """Losslessly re-optimize an encoded JPEG in place with mozjpeg, if available."""
+        if mozjpeg_lossless_optimization is None:
+            return
 
+        try:
+            data = jpeg_path.read_bytes()
+            optimized = mozjpeg_lossless_optimization.optimize(
+                data, copy=mozjpeg_lossless_optimization.COPY_MARKERS.ICC)
+            if len(optimized) < len(data):
+                jpeg_path.write_bytes(optimized)
+        except Exception as e:
+            print(f"mozjpeg failed on {jpeg_path}, keeping current output: {e}")
+
+    def _trim_palette(self, img: Image.Image) -> Image.Image:
+        """Drop palette entries past the highest index the pixels actually use."""
+        if img.mode != 'P' or img.palette is None:
+            return img
+
+        used = img.getextrema()[1] + 1
+        transparency = img.info.get('transparency')
+        if isinstance(transparency, bytes):
+            used = max(used, len(transparency))
+        elif isinstance(transparency, int):
+            used = max(used, transparency + 1)
+        mode = img.palette.mode
+        palette = img.palette.palette
+        if len(palette) > len(mode) * used:
+            img.putpalette(palette[:len(mode) * used], mode)
         return img
 
+    def _quantize_png(self, img: Image.Image) -> Image.Image:
+        """Reduce a >256 color image to a palette with libimagequant, if available."""
+        if imagequant is None:
+            return img
+
+        try:
+            return imagequant.quantize_pil_image(
+                img,
+                dithering_level=1.0,
+                max_colors=256,
+                min_quality=self.config.png_quantize_min_quality,
+                max_quality=self.config.png_quantize_max_quality,
+            )
+        except Exception:
+            return img  # Quality target not reachable; keep full color
+
+
+# Compressor reused by every job a pool worker runs, set up once per batch.
+# Thread-local so concurrent thread-pool batches keep their own configs.
+_worker_state = threading.local()
+
+
+def _init_compress_worker(config: CompressionConfig):
+    """Pool initializer: build the worker's compressor once for the whole batch."""
+    _worker_state.compressor = ImageCompressor(config)
+
+
+def _compress_worker(image_path: Path) -> Tuple[Path, bool, int, str]:
+    """Compress one image in a pool worker; module-level so it pickles by name."""
+    success, new_size, savings = _worker_state.compressor.compress_image(image_path)
+    return image_path, success, new_size, savings
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # WEB SERVER
@@ -601,6 +1207,11 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 <input type="checkbox" id="backup" checked>
                 Create Backups
             </label>
+
+            <label class="checkbox-label">
+                <input type="checkbox" id="webp">
+                Convert to WebP
+            </label>
         </div>
     </div>
 
@@ -630,42 +1241,84 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
 
     <script>
         let images = [];
+        let imageIndexByPath = new Map();
         let selectedPaths = new Set();
+        let selectedSize = 0;  // kept in step with selectedPaths
+
+        // Calls onLine for each complete line of a streamed NDJSON response
+        async function readLines(response, onLine) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let pending = '';
+
+            while (true) {
+                const {value, done} = await reader.read();
+                if (done) break;
+
+                pending += decoder.decode(value, {stream: true});
+                const lines = pending.split('\\n');
+                pending = lines.pop();
+                lines.filter(line => line).forEach(onLine);
+            }
+            if (pending) onLine(pending);
+        }
+
+        // Bumped on every load so lines from a superseded /api/images stream are dropped
+        let loadGeneration = 0;
 
         async function loadImages() {
+            const generation = ++loadGeneration;
+            images = [];
+            imageIndexByPath = new Map();
+            resetGrid();
+
             try {
+                // Images stream in one per line, so cards appear before the scan finishes
                 const response = await fetch('/api/images');
-                images = await response.json();
-                renderGrid();
-                document.getElementById('subtitle').textContent =
-                    `Found ${images.length} images in project`;
+                await readLines(response, line => {
+                    if (generation !== loadGeneration) return;
+                    const img = JSON.parse(line);
+                    imageIndexByPath.set(img.path, images.length);
+                    images.push(img);
+                    scheduleAppend();
+                });
             } catch (error) {
                 console.error('Error loading images:', error);
             }
-        }
-
-        function renderGrid() {
-            const grid = document.getElementById('image-grid');
 
+            if (generation !== loadGeneration) return;
             if (images.length === 0) {
-                grid.innerHTML = `
-                    <div class="empty-state" style="grid-column: 1 / -1;">
-                        <h2>No images found</h2>
-                        <p>No image files were found in the project directory.</p>
-                    </div>
-                `;
-                return;
+                showEmptyState();
             }
+            document.getElementById('subtitle').textContent =
+                `Found ${images.length} images in project`;
+        }
+
+        // Cards are inserted at most this many at a time, one batch per animation frame
+        const GRID_BATCH_SIZE = 25;
+        let renderedCount = 0;
+        let appendScheduled = false;
+
+        // Thumbnails are only attached while a card is within ~2 screens of the
+        // viewport, so the browser holds decoded bitmaps for visible cards only
+        const thumbnailObserver = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                const thumb = entry.target;
+                if (entry.isIntersecting) {
+                    const img = images[thumb.dataset.index];
+                    thumb.src = `/api/thumb?path=${encodeURIComponent(img.path)}&v=${img.mtime}`;
+                } else {
+                    thumb.removeAttribute('src');
+                }
+            });
+        }, {rootMargin: '200% 0px'});
 
-            grid.innerHTML = images.map((img, index) => `
-                <div class="card ${selectedPaths.has(img.path) ? 'selected' : ''}"
-                     onclick="toggleSelect('${img.path}')" data-path="${img.path}">
+        function cardHTML(img, index) {
+            return `
+                <div class="card ${selectedPaths.has(img.path) ? 'selected' : ''}" data-path="${img.path}">
                     <input type="checkbox" class="card-checkbox"
-                           ${selectedPaths.has(img.path) ? 'checked' : ''}
-                           onclick="event.stopPropagation(); toggleSelect('${img.path}')">
-                    <img class="card-thumbnail"
-                         src="data:image/jpeg;base64,${img.thumbnail}"
-                         alt="${img.filename}">
+                           ${selectedPaths.has(img.path) ? 'checked' : ''}>
+                    <img class="card-thumbnail" data-index="${index}" alt="${img.filename}">
                     <div class="card-info">
                         <div class="card-filename" title="${img.filename}">${img.filename}</div>
                         <div class="card-meta">${img.dimensions}</div>
@@ -673,25 +1326,86 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                     </div>
                     <div class="card-status neutral" id="status-${index}">—</div>
                 </div>
-            `).join('');
+            `;
         }
 
-        function toggleSelect(path) {
-            if (selectedPaths.has(path)) {
-                selectedPaths.delete(path);
-            } else {
+        function resetGrid() {
+            thumbnailObserver.disconnect();
+            document.getElementById('image-grid').innerHTML = '';
+            renderedCount = 0;
+        }
+
+        function showEmptyState() {
+            document.getElementById('image-grid').innerHTML = `
+                <div class="empty-state" style="grid-column: 1 / -1;">
+                    <h2>No images found</h2>
+                    <p>No image files were found in the project directory.</p>
+                </div>
+            `;
+        }
+
+        function scheduleAppend() {
+            if (!appendScheduled) {
+                appendScheduled = true;
+                requestAnimationFrame(appendCards);
+            }
+        }
+
+        // Appends cards for images that have arrived but are not on the grid yet
+        function appendCards() {
+            appendScheduled = false;
+            const grid = document.getElementById('image-grid');
+            const start = renderedCount;
+            const end = Math.min(start + GRID_BATCH_SIZE, images.length);
+            if (start >= end) return;
+
+            grid.insertAdjacentHTML('beforeend',
+                images.slice(start, end).map((img, i) => cardHTML(img, start + i)).join(''));
+            Array.from(grid.querySelectorAll('.card-thumbnail'))
+                .slice(start, end)
+                .forEach(thumb => thumbnailObserver.observe(thumb));
+            renderedCount = end;
+
+            if (renderedCount < images.length) {
+                scheduleAppend();
+            }
+        }
+
+        // One delegated handler for every card instead of two inline handlers each
+        document.getElementById('image-grid').addEventListener('click', event => {
+            const card = event.target.closest('.card');
+            if (card) {
+                toggleSelect(card);
+            }
+        });
+
+        function toggleSelect(card) {
+            const path = card.dataset.path;
+            const isSelected = !selectedPaths.has(path);
+            const size = images[imageIndexByPath.get(path)].original_size;
+            if (isSelected) {
                 selectedPaths.add(path);
+                selectedSize += size;
+            } else {
+                selectedPaths.delete(path);
+                selectedSize -= size;
             }
-            updateUI();
+
+            // Only the clicked card changes, so update it directly
+            card.classList.toggle('selected', isSelected);
+            card.querySelector('.card-checkbox').checked = isSelected;
+            updateSelectionInfo();
         }
 
         function selectAll() {
             images.forEach(img => selectedPaths.add(img.path));
+            selectedSize = images.reduce((sum, img) => sum + img.original_size, 0);
             updateUI();
         }
 
         function deselectAll() {
             selectedPaths.clear();
+            selectedSize = 0;
             updateUI();
         }
 
@@ -704,12 +1418,11 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
                 card.querySelector('.card-checkbox').checked = isSelected;
             });
 
-            // Update selection info
-            const totalSize = images
-                .filter(img => selectedPaths.has(img.path))
-                .reduce((sum, img) => sum + img.original_size, 0);
+            updateSelectionInfo();
+        }
 
-            const sizeStr = formatSize(totalSize);
+        function updateSelectionInfo() {
+            const sizeStr = formatSize(selectedSize);
             document.getElementById('selection-info').textContent =
                 `${selectedPaths.size} images selected${selectedPaths.size > 0 ? ' (' + sizeStr + ')' : ''}`;
         }
@@ -747,46 +1460,73 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             const paths = Array.from(selectedPaths);
             const quality = document.getElementById('quality').value;
             const backup = document.getElementById('backup').checked;
+            const webp = document.getElementById('webp').checked;
 
             let totalOriginal = 0;
             let totalCompressed = 0;
+            let completed = 0;
+
+            function applyResult(result) {
+                const imgIndex = imageIndexByPath.get(result.path);
+
+                completed++;
+                totalOriginal += images[imgIndex].original_size;
+                totalCompressed += result.new_size;
+
+                // Update UI
+                const statusEl = document.getElementById('status-' + imgIndex);
+                const sizeEl = document.getElementById('size-' + imgIndex);
+
+                if (result.success) {
+                    statusEl.textContent = result.savings;
+                    statusEl.className = 'card-status ' + (result.savings.startsWith('-') ? 'success' : 'neutral');
+                    sizeEl.textContent = formatSize(result.new_size);
+                } else {
+                    statusEl.textContent = 'Error';
+                    statusEl.className = 'card-status neutral';
+                }
+            }
 
-            for (let i = 0; i < paths.length; i++) {
-                const path = paths[i];
-                const imgIndex = images.findIndex(img => img.path === path);
-
-                progressFill.style.width = ((i + 1) / paths.length * 100) + '%';
-                progressText.textContent = `Compressing ${i + 1}/${paths.length}: ${images[imgIndex].filename}`;
-
-                try {
-                    const response = await fetch('/api/compress', {
-                        method: 'POST',
-                        headers: {'Content-Type': 'application/json'},
-                        body: JSON.stringify({path, quality: parseInt(quality), backup})
-                    });
-
-                    const result = await response.json();
-
-                    totalOriginal += images[imgIndex].original_size;
-                    totalCompressed += result.new_size;
-
-                    // Update UI
-                    const statusEl = document.getElementById('status-' + imgIndex);
-                    const sizeEl = document.getElementById('size-' + imgIndex);
-
-                    if (result.success) {
-                        statusEl.textContent = result.savings;
-                        statusEl.className = 'card-status ' + (result.savings.startsWith('-') ? 'success' : 'neutral');
-                        sizeEl.textContent = formatSize(result.new_size);
-                    } else {
-                        statusEl.textContent = 'Error';
-                        statusEl.className = 'card-status neutral';
-                    }
-                } catch (error) {
-                    console.error('Error compressing:', error);
+            // Streamed results are queued and applied at most once per frame,
+            // so a burst of completions costs one DOM update pass
+            const pendingResults = [];
+            let flushScheduled = false;
+
+            function queueResult(result) {
+                pendingResults.push(result);
+                if (!flushScheduled) {
+                    flushScheduled = true;
+                    requestAnimationFrame(flushResults);
                 }
             }
 
+            function flushResults() {
+                flushScheduled = false;
+                const batch = pendingResults.splice(0);
+                if (batch.length === 0) return;
+
+                batch.forEach(applyResult);
+
+                const last = images[imageIndexByPath.get(batch[batch.length - 1].path)];
+                progressFill.style.width = (completed / paths.length * 100) + '%';
+                progressText.textContent = `Compressed ${completed}/${paths.length}: ${last.filename}`;
+            }
+
+            try {
+                const response = await fetch('/api/compress_batch', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({paths, quality: parseInt(quality), backup, webp})
+                });
+
+                // Results stream back one JSON object per line as each image finishes
+                await readLines(response, line => queueResult(JSON.parse(line)));
+            } catch (error) {
+                console.error('Error compressing:', error);
+            }
+
+            flushResults();
+
             btn.disabled = false;
             btn.textContent = 'Compress Selected';
             progressContainer.classList.remove('active');
@@ -808,6 +1548,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
 
         function refreshImages() {
             selectedPaths.clear();
+            selectedSize = 0;
             document.getElementById('summary').classList.remove('visible');
             loadImages();
         }
@@ -825,6 +1566,7 @@ class CompressorHandler(SimpleHTTPRequestHandler):
 
     compressor = ImageCompressor()
     project_dir = Path(__file__).parent.parent  # Scan parent directory for images
+    REJECTED_PATH_ERROR = "Error: not an image inside the project folder"
 
     def do_GET(self):
         """Handle GET requests."""
@@ -838,24 +1580,60 @@ class CompressorHandler(SimpleHTTPRequestHandler):
 
         elif parsed.path == '/api/images':
             self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Type', 'application/x-ndjson')
             self.end_headers()
 
-            image_paths = scan_for_images(self.project_dir)
-            images_data = []
+            # One stat per file during the scan, reused for the size and cache key
+            scanned = scan_for_images_with_stats(self.project_dir)
+
+            # Header parsing mostly waits on disk, so it runs in parallel;
+            # map() keeps results in scan order
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+                # One JSON object per line, written as soon as each image is ready
+                for info in executor.map(self._load_image_info, scanned):
+                    if info is not None:
+                        self.wfile.write((json.dumps(info) + '\n').encode())
+                        self.wfile.flush()
+
+        elif parsed.path == '/api/thumb':
+            image_path = self._project_image(parse_qs(parsed.query).get('path', [''])[0])
+            data = create_thumbnail(image_path) if image_path is not None else b''
+            if not data:
+                self.send_error(404)
+                return
 
-            for path in image_paths:
-                try:
-                    info = self.compressor.get_image_info(path)
-                    images_data.append(info)
-                except Exception as e:
-                    print(f"Error loading {path}: {e}")
-
-            self.wfile.write(json.dumps(images_data).encode())
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(data)))
+            # The page adds the file's mtime to the URL, so a URL's bytes never change
+            self.send_header('Cache-Control', 'max-age=31536000, immutable')
+            self.end_headers()
+            self.wfile.write(data)
 
         else:
             self.send_error(404)
 
+    def _project_image(self, path: str) -> Optional[Path]:
+        """Resolve a requested path, or None unless it is an image inside project_dir."""
+        if not path:
+            return None
+        # abspath folds any '..' without following links, so symlinked images still work
+        requested = Path(os.path.abspath(path))
+        if Path(os.path.abspath(self.project_dir)) not in requested.parents:
+            return None
+        if requested.suffix.lower() not in IMAGE_EXTENSIONS or not requested.is_file():
+            return None
+        return requested
+
+    def _load_image_info(self, scanned: Tuple[Path, os.stat_result]) -> Optional[Dict]:
+        """Get image info for the grid, or None if the file can't be read."""
+        path, stat = scanned
+        try:
+            return self.compressor.get_image_info(path, stat)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return None
+
     def do_POST(self):
         """Handle POST requests."""
         parsed = urlparse(self.path)
@@ -865,13 +1643,19 @@ class CompressorHandler(SimpleHTTPRequestHandler):
             post_data = json.loads(self.rfile.read(content_length))
 
             path = Path(post_data['path'])
-            quality = post_data.get('quality', 85)
-            backup = post_data.get('backup', True)
-
-            self.compressor.config.quality = quality
-            self.compressor.config.create_backup = backup
-
-            success, new_size, savings = self.compressor.compress_image(path)
+            compressor = self._request_compressor(post_data)
+
+            if self._project_image(str(path)) is None:
+                success, new_size, savings = False, 0, self.REJECTED_PATH_ERROR
+            else:
+                new_size = compression_cache.lookup(path, compressor.config)
+                if new_size is not None:
+                    success, savings = True, "Already optimized"
+                else:
+                    success, new_size, savings = compressor.compress_image(path)
+                    if success:
+                        # Saved when the server stops; batches also save as they finish
+                        compression_cache.record(path, compressor.config)
 
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
@@ -884,9 +1668,41 @@ class CompressorHandler(SimpleHTTPRequestHandler):
             }
             self.wfile.write(json.dumps(result).encode())
 
+        elif parsed.path == '/api/compress_batch':
+            content_length = int(self.headers['Content-Length'])
+            post_data = json.loads(self.rfile.read(content_length))
+
+            # Only images under project_dir may be rewritten; the rest are reported as errors
+            paths, rejected = [], []
+            for p in post_data['paths']:
+                (paths if self._project_image(p) is not None else rejected).append(Path(p))
+            compressor = self._request_compressor(post_data)
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.end_headers()
+
+            for path in rejected:
+                result = {'path': str(path), 'success': False, 'new_size': 0,
+                          'savings': self.REJECTED_PATH_ERROR}
+                self.wfile.write((json.dumps(result) + '\n').encode())
+
+            # One JSON result per line, written as each image finishes
+            for result in compressor.compress_batch(paths):
+                self.wfile.write((json.dumps(result) + '\n').encode())
+                self.wfile.flush()
+
         else:
             self.send_error(404)
 
+    def _request_compressor(self, post_data: Dict) -> ImageCompressor:
+        """Build a compressor for one request; the shared config is never mutated."""
+        config = replace(self.compressor.config,
+                         quality=post_data.get('quality', 85),
+                         create_backup=post_data.get('backup', True),
+                         convert_to_webp=post_data.get('webp', False))
+        return ImageCompressor(config)
+
     def log_message(self, format, *args):
         """Suppress default logging."""
         pass
@@ -910,7 +1726,12 @@ def main():
 
 """)
 
-    httpd = HTTPServer(server_address, CompressorHandler)
+    if not HAS_LIBJPEG_TURBO:
+        print("  Warning: Pillow is not built with libjpeg-turbo; JPEG encoding will be slower.")
+        print("           See \"Requirements\" in README.md to install pillow-simd.\n")
+
+    # One thread per request, so thumbnails keep loading while a batch compresses
+    httpd = ThreadingHTTPServer(server_address, CompressorHandler)
 
     # Open browser after a short delay
     def open_browser():
@@ -924,7 +1745,10 @@ def main():
     except KeyboardInterrupt:
         print("\n  Server stopped.")
         httpd.shutdown()
+    finally:
+        compression_cache.save()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()